@@ -0,0 +1,11 @@
+# gunicorn.conf.py
+# Worker lifecycle hooks for main.py. Hooks run inside the worker process; main is imported lazily
+# so the master never builds the pools/session before forking.
+
+def post_worker_init(worker):
+    import main
+    main.warm_connections()
+
+def worker_exit(server, worker):
+    import main
+    main.shutdown_pools()
@@ -7,56 +7,326 @@
 # - Defensive: won't die on single-site failures; prints logs for debugging
 
 from flask import Flask, request, jsonify
-import requests, re, time, threading
-from bs4 import BeautifulSoup
-import concurrent.futures
-from urllib.parse import urljoin, quote_plus
+from flask.json.provider import DefaultJSONProvider
+import orjson
+import requests, re, time, threading, socket
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+import lxml.html
+from lxml import etree
+import concurrent.futures, functools, collections, heapq
+from html import unescape
+from urllib.parse import urljoin, quote_plus, urlsplit
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (C) for jsonify() and request.get_json()."""
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # ---------------- CONFIG ----------------
 USER_AGENT = "Mozilla/5.0 (compatible; ClothesFinder/5.0; +https://example.com)"
-REQUEST_TIMEOUT = 10
-MAX_SCRAPER_WORKERS = 6
-MAX_PRODUCT_FETCH_WORKERS = 10
+REQUEST_TIMEOUT = 7       # read timeout per request
+CONNECT_TIMEOUT = 3.05    # fail fast on unreachable hosts
+MAX_SCRAPER_WORKERS = 24  # shared by all concurrent searches (each search submits one task per site)
+MAX_PRODUCT_FETCH_WORKERS = 32  # shared by all concurrent searches
+MAX_CONCURRENT_PER_HOST = 2  # simultaneous requests to one site (avoid bans/CAPTCHAs)
+MIN_HOST_INTERVAL = 0.1   # seconds between request starts to the same host (per worker process)
 CACHE_TTL = 300
+EMPTY_RESULT_TTL = 30     # searches that found nothing are retried sooner
+PARTIAL_RESULT_TTL = 60   # searches cut short (early stop or SEARCH_TIMEOUT) are incomplete; refresh sooner
+MAX_CACHE_ENTRIES = 2048  # bound on cached searches/listings/pages (least recently used evicted)
+STALE_IF_ERROR_TTL = 3600 # how long a site's last good listing may stand in when the site fails
+DNS_CACHE_TTL = 300       # seconds to reuse a resolved host address
+MAX_DNS_ENTRIES = 256     # resolved addresses kept (least recently used evicted)
+MAX_VALIDATED_PAGES = 256 # pages kept for ETag/Last-Modified revalidation (304 fast path)
 TOP_PER_SITE = 8          # how many listings to collect per site before fetching product pages
+MIN_REGEX_LINKS = 3       # Vinted/Tradera: fewer raw-HTML link matches than this falls back to an lxml parse
 TOP_RETURN = 6            # how many top results to return to client
+STREAM_CHUNK_SIZE = 65536 # bytes read per chunk when a scraper can stop a download early
+MAX_STREAM_BYTES = 512000 # never read more than this from a listing page that can stop early
+MAX_PAGE_BYTES = 2000000  # never read more than this from any page (decompressed)
+SEARCH_TIMEOUT = 15       # overall budget (seconds) per search; whatever arrived by then is scored
+PREHEAT_CONNECTIONS = True # open a connection to each scraped site when a gunicorn worker starts (post_worker_init)
 DEBUG_MODE = False        # set True to return more debug info (full_text) - careful with privacy/size
 
 # ---------------- CACHE ----------------
-_cache = {}
+# LRU order: most recently used last, so the oldest-used entry is evicted first once full
+_cache = collections.OrderedDict()
 _cache_lock = threading.Lock()
-def cache_get(k):
+def cache_get(k, ttl=None):
+    """Return the value cached under k if it is still fresh (by the ttl it was stored with, or the ttl given).
+    Entries stored with keep_stale=True are kept for STALE_IF_ERROR_TTL so callers can ask for a stale copy
+    when a refresh fails; everything else is dropped once past its own ttl.
+    Reads don't take _cache_lock: single OrderedDict operations are atomic under the GIL."""
+    v = _cache.get(k)
+    if not v:
+        return None
+    ts, entry_ttl, keep_for, val = v
+    if ttl is None:
+        ttl = entry_ttl
+    age = time.monotonic() - ts
+    if age > keep_for:
+        with _cache_lock:
+            # only drop it if nobody stored a fresh value meanwhile
+            if _cache.get(k) is v:
+                del _cache[k]
+        return None
+    if age > ttl:
+        return None
+    try:
+        _cache.move_to_end(k)
+    except KeyError:  # evicted since the lookup above; the value we hold is still good
+        pass
+    return val
+def cache_set(k, val, ttl=CACHE_TTL, keep_stale=False):
+    keep_for = max(ttl, STALE_IF_ERROR_TTL) if keep_stale else ttl
     with _cache_lock:
-        v = _cache.get(k)
-        if not v:
-            return None
-        ts, val = v
-        if time.time() - ts > CACHE_TTL:
-            del _cache[k]
-            return None
+        _cache[k] = (time.monotonic(), ttl, keep_for, val)
+        _cache.move_to_end(k)
+        while len(_cache) > MAX_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+# single-flight: concurrent callers for the same key share one computation instead of stampeding upstream
+_inflight = {}
+_inflight_lock = threading.Lock()
+def single_flight(k, fn):
+    """Return fn(); if another thread is already computing k, wait for and share its result."""
+    with _inflight_lock:
+        fut = _inflight.get(k)
+        leader = fut is None
+        if leader:
+            fut = concurrent.futures.Future()
+            _inflight[k] = fut
+    if not leader:
+        return fut.result()
+    try:
+        val = fn()
+        fut.set_result(val)
         return val
-def cache_set(k, val):
-    with _cache_lock:
-        _cache[k] = (time.time(), val)
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(k, None)
 
 # ---------------- UTIL ----------------
-HEADERS = {"User-Agent": USER_AGENT}
+# Advertise only the encodings urllib3 can decode here (br needs the brotli package).
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Encoding": ACCEPT_ENCODING,
+}
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled sockets probe idle peers early, so dead keep-alive connections are dropped fast."""
+    def init_poolmanager(self, *args, **kwargs):
+        opts = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        if hasattr(socket, "TCP_KEEPIDLE"):  # Linux only
+            opts.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 15))
+        kwargs["socket_options"] = opts
+        super().init_poolmanager(*args, **kwargs)
+
+# One pooled session shared by all worker threads: keep-alive reuses TCP+TLS connections per host.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+_adapter = KeepAliveAdapter(pool_connections=8,
+                            pool_maxsize=MAX_SCRAPER_WORKERS + MAX_PRODUCT_FETCH_WORKERS,
+                            # Retry-After is ignored: urllib3 sleeps for it uncapped, parking a pool thread
+                            # (and a host slot) for as long as the site asks
+                            max_retries=Retry(total=1, connect=1, backoff_factor=0.2,
+                                              status_forcelist=(500, 502, 503, 504), allowed_methods=("GET", "HEAD"),
+                                              respect_retry_after_header=False))
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# DNS: the scraped hosts are a fixed handful, so remember lookups for a while instead of
+# hitting the resolver on every new connection.
+_orig_getaddrinfo = socket.getaddrinfo
+# Bounded like _validators: product links can point at any host, and this serves the whole process.
+_dns_cache = collections.OrderedDict()
+_dns_lock = threading.Lock()
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _dns_lock:
+        hit = _dns_cache.get(key)
+        if hit and now - hit[0] < DNS_CACHE_TTL:
+            _dns_cache.move_to_end(key)
+            return hit[1]
+    res = _orig_getaddrinfo(host, port, family, type, proto, flags)
+    with _dns_lock:
+        _dns_cache[key] = (now, res)
+        _dns_cache.move_to_end(key)
+        while len(_dns_cache) > MAX_DNS_ENTRIES:
+            _dns_cache.popitem(last=False)
+    return res
+socket.getaddrinfo = _cached_getaddrinfo
 
-def http_get(url, params=None):
+# Politeness: parallel across sites, but only a couple of requests at a time to any one host, with
+# starts spaced MIN_HOST_INTERVAL apart. Work waiting for its host sits in a per-host queue, not in a
+# pool thread, so a burst for one site never stalls fetches for the others.
+_host_queues = {}                        # host -> deque of (pool, future, fn, args) not yet started
+_host_running = collections.Counter()    # host -> jobs currently on a pool
+_host_next_start = {}                    # host -> earliest monotonic time the next job may start
+_host_cond = threading.Condition()
+_host_dispatcher = None
+
+def submit_to_host(pool, url, fn, *args):
+    """Like pool.submit(fn, *args), but admitted under url's host limits. Cancelling the returned
+    future before it starts drops it from the queue."""
+    global _host_dispatcher
+    fut = concurrent.futures.Future()
+    host = urlsplit(url).netloc
+    with _host_cond:
+        _host_queues.setdefault(host, collections.deque()).append((pool, fut, fn, args))
+        if _host_dispatcher is None:
+            # started lazily so it is created in the serving process, not before a fork
+            _host_dispatcher = threading.Thread(target=_dispatch_hosts, name="host-dispatch", daemon=True)
+            _host_dispatcher.start()
+        _host_cond.notify()
+    return fut
+
+def _dispatch_hosts():
+    """Hand queued jobs to their pools as their host's concurrency and spacing allow."""
+    with _host_cond:
+        while True:
+            now = time.monotonic()
+            wait = None
+            for host in list(_host_queues):
+                queue = _host_queues[host]
+                while queue and _host_running[host] < MAX_CONCURRENT_PER_HOST:
+                    start = _host_next_start.get(host, 0.0)
+                    if start > now:
+                        wait = start - now if wait is None else min(wait, start - now)
+                        break
+                    pool, fut, fn, args = queue.popleft()
+                    if not fut.set_running_or_notify_cancel():
+                        continue  # cancelled while queued (search finished or timed out)
+                    _host_running[host] += 1
+                    _host_next_start[host] = now + MIN_HOST_INTERVAL
+                    try:
+                        pool.submit(_run_for_host, host, fut, fn, args)
+                    except RuntimeError as e:  # pool shut down (worker exiting)
+                        _host_running[host] -= 1
+                        fut.set_exception(e)
+                if not queue:
+                    del _host_queues[host]
+            # forget idle hosts so the tables don't grow with every host a product link points at
+            for host in [h for h, t in _host_next_start.items() if t <= now and not _host_running[h]
+                         and h not in _host_queues]:
+                del _host_next_start[host]
+                del _host_running[host]
+            _host_cond.wait(wait)
+
+def _run_for_host(host, fut, fn, args):
     try:
-        r = requests.get(url, params=params, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-        r.raise_for_status()
-        return r.text
+        fut.set_result(fn(*args))
+    except BaseException as e:
+        fut.set_exception(e)
+    finally:
+        with _host_cond:
+            _host_running[host] -= 1
+            _host_cond.notify()
+
+def http_get(url, params=None, stop_when=None, revalidate=False):
+    """GET url and return its HTML, or None on failure. Doesn't throttle: submit callers via submit_to_host.
+    stop_when(partial_html) -> True ends the download early once the caller has what it needs.
+    revalidate=True makes the request conditional on what remember_page() stored for url, and returns
+    NOT_MODIFIED when the server answers 304."""
+    try:
+        return _fetch(url, params, stop_when, revalidate)
     except Exception as e:
         print(f"[http_get] FAILED {url} -> {e}")
         return None
 
+# ETag/Last-Modified per product URL plus the page's visible text (not the raw HTML, which is mostly
+# markup), so a re-fetch answered with a cheap 304 can be re-analyzed without downloading it again.
+_validators = collections.OrderedDict()
+_validators_lock = threading.Lock()
+NOT_MODIFIED = object()
+
+def remember_page(url, text):
+    """Attach a page's visible text to the validators _fetch stored for url (no-op if the page had none)."""
+    with _validators_lock:
+        known = _validators.get(url)
+        if known:
+            _validators[url] = (known[0], known[1], text)
+
+def remembered_page(url):
+    """Visible text stored by remember_page for url, or None."""
+    with _validators_lock:
+        known = _validators.get(url)
+    return known[2] if known else None
+
+def _fetch(url, params, stop_when, revalidate):
+    """Do the actual GET for http_get (raises on failure)."""
+    if stop_when is not None:
+        with SESSION.get(url, params=params, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT), stream=True) as r:
+            r.raise_for_status()
+            return _read_capped(r, MAX_STREAM_BYTES, stop_when)
+    headers = {}
+    known = None
+    if revalidate:
+        with _validators_lock:
+            known = _validators.get(url)
+        if known and known[2] is None:
+            known = None  # the body was never analyzed, so a 304 would leave us with nothing
+    if known:
+        etag, last_modified, _ = known
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    with SESSION.get(url, params=params, headers=headers, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT), stream=True) as r:
+        if r.status_code == 304 and known:
+            # consume the (empty) body so closing the response hands the socket back to the pool
+            r.content
+            with _validators_lock:
+                if url in _validators:
+                    _validators.move_to_end(url)
+            return NOT_MODIFIED
+        r.raise_for_status()
+        text = _read_capped(r, MAX_PAGE_BYTES)
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if revalidate:
+        with _validators_lock:
+            if etag or last_modified:
+                _validators[url] = (etag, last_modified, None)
+                _validators.move_to_end(url)
+                while len(_validators) > MAX_VALIDATED_PAGES:
+                    _validators.popitem(last=False)
+            else:
+                _validators.pop(url, None)
+    return text
+
+def _read_capped(r, limit, stop_when=None):
+    """Read a streamed (already decompressed) body up to limit bytes, or until stop_when(partial_html)."""
+    encoding = r.encoding or "utf-8"
+    buf = bytearray()
+    for chunk in r.iter_content(STREAM_CHUNK_SIZE):
+        buf += chunk
+        if len(buf) >= limit:
+            del buf[limit:]
+            break
+        if stop_when is not None and stop_when(buf.decode(encoding, errors="replace")):
+            break
+    return buf.decode(encoding, errors="replace")
+
+WS_RE = re.compile(r'\s+')
+
 def clean_text(t):
     if not t:
         return ""
-    return re.sub(r'\s+', ' ', t).strip()
+    return WS_RE.sub(' ', t).strip()
 
 def parse_bool(v):
     if isinstance(v, bool):
@@ -104,43 +374,60 @@ SYNONYMS = {
     "levi": ["levi","levis","levi's"]
 }
 
-def term_in_text(text, term):
-    """Return True if term or any synonyms appear in text."""
-    if not term:
-        return False
-    t = clean_text(text).lower()
-    term_key = term.lower()
-    # direct
-    if term_key in t:
-        return True
-    # synonyms
-    alts = SYNONYMS.get(term_key, [])
-    for a in alts:
-        if a in t:
-            return True
+# reverse index: synonym -> the keys listing it (e.g. "denim" -> ["jeans", "blå"])
+SYNONYM_KEYS = {}
+for _key, _vals in SYNONYMS.items():
+    for _v in _vals:
+        SYNONYM_KEYS.setdefault(_v, []).append(_key)
+
+def contains_any(t, terms):
+    """True if any of terms (e.g. a term_alternatives() tuple) is a substring of t (lowercased text)."""
+    return any(a in t for a in terms)
+
+@functools.lru_cache(maxsize=1024)
+def term_alternatives(term_key):
+    """Every substring that counts as term_key: itself, its synonyms, and the keys it is a synonym of."""
+    alts = [term_key]
+    alts += SYNONYMS.get(term_key, [])
     # sometimes user input equals a synonym key; check reverse mapping
-    # check all keys where given term appears in synonyms
-    for k, vals in SYNONYMS.items():
-        if term_key in vals and k in t:
-            return True
-    return False
+    alts += SYNONYM_KEYS.get(term_key, [])
+    return tuple(dict.fromkeys(alts))
+
+def words_re(words):
+    """One compiled alternation matching any of words at the start of a word (so "women" doesn't hit "men",
+    while prefix compounds like "herrjacka" still match "herr"; suffix compounds like "småbarn" don't)."""
+    return re.compile(r'\b(?:' + '|'.join(map(re.escape, words)) + r')')
 
 # ---------------- SIZE / JEANS LOGIC ----------------
+JEANS_WL_RE = re.compile(r'w\s?(\d{2})\s*[^\d]{1,3}\s*l\s?(\d{2})')
+JEANS_PAIR_RE = re.compile(r'\b(\d{2})\s*[\/x ]\s*(\d{2})\b')
+JEANS_WAIST_RE = re.compile(r'\b(2[6-9]|3[0-9]|4[0-4])\b')  # waist plausible range 26-44
+KIDS_SIZE_RE = re.compile(r'\b(9[0-9]|1[0-6][0-9]|170)\b')  # 90-170 roughly
+CHILD_SIZE_RE = re.compile(r'\b(9[0-9]|1[0-6][0-9])\b')
+SIZE_TOKEN_RE = re.compile(r'\b(xs|s|m|l|xl|xxl)\b', re.IGNORECASE)
+# a lone "m"/"s"/"l" shows up all over a page (size pickers, "5 m", abbreviations): in page text a letter
+# size only counts after a label; bare tokens are trusted in listing titles only
+SIZE_LABEL = r'(?:storlek|strl|stl|size)\.?:?\s*'
+LABELLED_SIZE_RE = re.compile(r'\b' + SIZE_LABEL + r'(xs|s|m|l|xl|xxl)\b', re.IGNORECASE)
+WORD_RE = re.compile(r'\w+')
+# plain substring alternation: kids words also end compounds ("småbarn", "spädbarn", "skolbarn")
+KIDS_WORDS_RE = re.compile('|'.join(map(re.escape, SYNONYMS.get("barn", []))))
+
 def parse_jeans(text):
     """Find waist/length patterns in text. Return dict or None."""
     if not text:
         return None
     t = text.lower()
     # W32 L30 or W 32 L 30
-    m = re.search(r'w\s?(\d{2})\s*[^\d]{1,3}\s*l\s?(\d{2})', t)
+    m = JEANS_WL_RE.search(t)
     if m:
         return {"waist": int(m.group(1)), "length": int(m.group(2))}
     # 32/30 or 32x30 or 32 30 (common)
-    m2 = re.search(r'\b(\d{2})\s*[\/x ]\s*(\d{2})\b', t)
+    m2 = JEANS_PAIR_RE.search(t)
     if m2:
         return {"waist": int(m2.group(1)), "length": int(m2.group(2))}
     # single waist number
-    m3 = re.search(r'\b(2[6-9]|3[0-9]|4[0-4])\b', t)  # waist plausible range 26-44
+    m3 = JEANS_WAIST_RE.search(t)
     if m3:
         return {"waist": int(m3.group(1)), "length": None}
     return None
@@ -157,30 +444,31 @@ def waist_to_size(waist):
     if w <= 36: return "XL"
     return "XXL"
 
-def detect_kids_by_size_or_text(text):
-    """Return True if text contains kid numeric sizes or explicit kids words."""
-    if not text:
-        return False
-    t = clean_text(text).lower()
+def kids_in_normalized(t):
+    """True if clean_text()-ed, lowercased text contains kid numeric sizes or explicit kids words."""
     # numeric child sizes (e.g. 92,98,...170)
-    if re.search(r'\b(9[0-9]|1[0-6][0-9]|170)\b', t):  # 90-170 roughly
+    if KIDS_SIZE_RE.search(t):
         return True
-    if any(k in t for k in SYNONYMS.get("barn", [])):
+    if KIDS_WORDS_RE.search(t):
         return True
     return False
 
 # ---------------- PRICE EXTRACTION ----------------
+PRICE_RE = re.compile(r'(\d[\d\s\.,]*\d)\s*(kr|:-|sek)\b', re.IGNORECASE)
+NON_DIGIT_RE = re.compile(r'[^\d]')
+BARE_PRICE_RE = re.compile(r'\b(\d{3,5})\b')
+
 def parse_price_from_page(html_text):
     """Return smallest found price or None. Looks for 'kr', ':-', 'sek', or 3-5 digit numbers as fallback."""
     if not html_text:
         return None
     text = clean_text(html_text)
     # look for currency markers
-    matches = re.findall(r'(\d[\d\s\.,]*\d)\s*(kr|:-|sek)\b', text, flags=re.IGNORECASE)
+    matches = PRICE_RE.findall(text)
     nums = []
     for m in matches:
         raw = m[0]
-        n = re.sub(r'[^\d]', '', raw)
+        n = NON_DIGIT_RE.sub('', raw)
         if n:
             try:
                 nums.append(float(n))
@@ -189,7 +477,7 @@ def parse_price_from_page(html_text):
     if nums:
         return min(nums)
     # fallback: any 3-5 digit numbers (be careful)
-    fallback = re.findall(r'\b(\d{3,5})\b', text)
+    fallback = BARE_PRICE_RE.findall(text)
     nums2 = []
     for n in fallback:
         try:
@@ -204,95 +492,147 @@ def parse_price_from_page(html_text):
 # Each scraper returns a list of candidate dicts: {site,title,url, snippet(optional)}
 # We intentionally keep list of candidates small (TOP_PER_SITE) to limit requests.
 
+# Pages are parsed straight into lxml (C); listing anchors are selected with XPath compiled once
+# at import, so there is no per-call selector parsing.
+_UTF8_HTML = lxml.html.HTMLParser(encoding="utf-8")
+def _class_xpath(cls):
+    return etree.XPath(f"//a[@href][contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]")
+def _href_xpath(path):
+    return etree.XPath(f"//a[contains(@href, '{path}')]")
+VINTED_LINK_XP = _class_xpath("catalog-item__link")
+VINTED_ITEM_XP = _href_xpath("/items/")   # vinted.se/items/<id>-<slug>
+TRADERA_LINK_XP = _class_xpath("listing-card__link")
+TRADERA_ITEM_XP = _href_xpath("/item/")   # tradera.com/item/<cat>/<id>/<slug>
+
+def parse_html(html):
+    """lxml tree for an HTML page, or None if it can't be parsed."""
+    try:
+        return lxml.html.fromstring(html.encode("utf-8"), parser=_UTF8_HTML)
+    except (etree.ParserError, ValueError) as e:
+        print(f"[parse_html] unparseable page -> {e}")
+        return None
+
+TAG_RE = re.compile(r'<[^>]+>')
+
+@functools.lru_cache(maxsize=None)
+def anchor_pattern(contains=None):
+    """Compiled regex matching <a href="...contains...">inner</a>; groups are (href, inner html)."""
+    href = r'[^"\']*' + re.escape(contains) + r'[^"\']*' if contains else r'[^"\']+'
+    return re.compile(r'<a\s[^>]*?href\s*=\s*["\'](' + href + r')["\'][^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+
+def extract_links(html, base, contains=None, site_name=None):
+    """Up to TOP_PER_SITE {site,title,url} dicts for anchors whose href contains `contains`."""
+    found = {}  # url -> candidate; dedupes while collecting
+    for m in anchor_pattern(contains).finditer(html):
+        href = unescape(m.group(1))
+        url_full = urljoin(base, href) if not href.startswith("http") else href
+        if url_full in found:
+            continue
+        # untitled anchors (e.g. a card's image link) don't claim the url, so its titled anchor still counts
+        title = clean_text(unescape(TAG_RE.sub(" ", m.group(2))))
+        if title:
+            found[url_full] = {"site": site_name or base.split("//")[-1].split("/")[0], "title": title, "url": url_full}
+            if len(found) >= TOP_PER_SITE:
+                break
+    return list(found.values())
+
+def enough_links(base, contains=None, site_name=None):
+    """stop_when predicate for http_get: True once the partial page already yields TOP_PER_SITE links."""
+    return lambda page: len(extract_links(page, base, contains, site_name)) >= TOP_PER_SITE
+
+def anchor_title(a):
+    return clean_text(a.text_content() or a.get("title") or "")
+
 def scrape_vinted(query, filters):
     out = []
     q = quote_plus(query)
     url = f"https://www.vinted.se/catalog?search_text={q}"
-    html = http_get(url)
+    # stop downloading once a full page of item links has arrived
+    html = http_get(url, stop_when=enough_links("https://www.vinted.se", "/items/", "Vinted"))
     if not html:
         return out
-    soup = BeautifulSoup(html, "html.parser")
-    anchors = soup.select("a.catalog-item__link")
-    if not anchors:
-        anchors = [a for a in soup.find_all("a", href=True) if "/item/" in a.get("href","")]
-    seen = set()
-    for a in anchors[:TOP_PER_SITE]:
+    # fast path: item links straight from the raw HTML; only build a tree when that finds too few
+    links = extract_links(html, "https://www.vinted.se", "/items/", "Vinted")
+    if len(links) >= MIN_REGEX_LINKS:
+        return links
+    tree = parse_html(html)
+    if tree is None:
+        return out
+    anchors = VINTED_LINK_XP(tree) or VINTED_ITEM_XP(tree)
+    found = {}  # url -> candidate; dedupes while collecting
+    for a in anchors:
         href = a.get("href")
         if not href:
             continue
         url_full = urljoin("https://www.vinted.se", href) if href.startswith("/") else href
-        if url_full in seen:
+        if url_full in found:
+            # a card's image and title anchors share one link; keep the one with text
+            if not found[url_full]["title"]:
+                found[url_full]["title"] = anchor_title(a)
             continue
-        seen.add(url_full)
-        title = clean_text(a.get_text() or a.get("title") or "")
-        out.append({"site":"Vinted","title":title,"url":url_full})
-    return out
+        if len(found) >= TOP_PER_SITE:
+            break
+        found[url_full] = {"site":"Vinted","title":anchor_title(a),"url":url_full}
+    return list(found.values())
 
 def scrape_tradera(query, filters):
     out = []
     q = quote_plus(query)
     url = f"https://www.tradera.com/search?q={q}"
-    html = http_get(url)
+    html = http_get(url, stop_when=enough_links("https://www.tradera.com", "/item/", "Tradera"))
     if not html:
         return out
-    soup = BeautifulSoup(html, "html.parser")
-    anchors = soup.select("a.listing-card__link")
-    if not anchors:
-        anchors = [a for a in soup.find_all("a", href=True) if "/item/" in a.get("href","")]
-    seen=set()
-    for a in anchors[:TOP_PER_SITE]:
+    links = extract_links(html, "https://www.tradera.com", "/item/", "Tradera")
+    if len(links) >= MIN_REGEX_LINKS:
+        return links
+    tree = parse_html(html)
+    if tree is None:
+        return out
+    anchors = TRADERA_LINK_XP(tree) or TRADERA_ITEM_XP(tree)
+    found = {}  # url -> candidate; dedupes while collecting
+    for a in anchors:
         href = a.get("href")
-        if not href: continue
+        if not href:
+            continue
         url_full = urljoin("https://www.tradera.com", href) if href.startswith("/") else href
-        if url_full in seen: continue
-        seen.add(url_full)
-        title = clean_text(a.get_text() or a.get("title") or "")
-        out.append({"site":"Tradera","title":title,"url":url_full})
-    return out
+        if url_full in found:
+            # a card's image and title anchors share one link; keep the one with text
+            if not found[url_full]["title"]:
+                found[url_full]["title"] = anchor_title(a)
+            continue
+        if len(found) >= TOP_PER_SITE:
+            break
+        found[url_full] = {"site":"Tradera","title":anchor_title(a),"url":url_full}
+    return list(found.values())
 
 def scrape_generic(query, filters, base, contains=None, site_name=None):
-    out=[]
     q = quote_plus(query)
+    # generic sites only need href + anchor text, so scan the raw HTML instead of building a DOM,
+    # and stop downloading once the listings we keep have arrived
+    enough = enough_links(base, contains, site_name)
     # try both patterns: base?q= and base+q
     url1 = base if "?" in base else (base + "?q=" + q)
-    html = http_get(url1)
+    html = http_get(url1, stop_when=enough)
     if not html:
-        html = http_get(base + q)
+        html = http_get(base + q, stop_when=enough)
         if not html:
-            return out
-    soup = BeautifulSoup(html, "html.parser")
-    anchors = soup.find_all("a", href=True)[:TOP_PER_SITE * 3]
-    seen=set()
-    for a in anchors:
-        href = a.get("href")
-        if not href:
-            continue
-        if contains and contains not in href:
-            # still allow if contains is None
-            continue
-        url_full = urljoin(base, href) if not href.startswith("http") else href
-        if url_full in seen:
-            continue
-        seen.add(url_full)
-        title = clean_text(a.get_text() or a.get("title") or "")
-        if not title:
-            # fallback: combine text of children
-            title = clean_text(' '.join([c.strip() for c in a.find_all(text=True)]))
-        if title:
-            out.append({"site": site_name or base.split("//")[-1].split("/")[0], "title": title, "url": url_full})
-    return out
+            return []
+    return extract_links(html, base, contains, site_name)
 
-# Define SCRAPERS mapping (name, function)
+# Define SCRAPERS mapping (name, function, site home page - its host is what the scraper requests)
 SCRAPERS = [
-    ("Vinted", scrape_vinted),
-    ("Sellpy", lambda q,f: scrape_generic(q,f,"https://www.sellpy.se/sok/","/product/","Sellpy")),
-    ("Tradera", scrape_tradera),
-    ("Blocket", lambda q,f: scrape_generic(q,f,"https://www.blocket.se/annonser/hela_sverige","/annons/","Blocket")),
-    ("Plick", lambda q,f: scrape_generic(q,f,"https://www.plick.com/search/","/p/","Plick")),
-    ("Facebook", lambda q,f: scrape_generic(q,f,"https://m.facebook.com/marketplace/search/","/marketplace/item/","Facebook Marketplace")),
+    ("Vinted", scrape_vinted, "https://www.vinted.se/"),
+    ("Sellpy", lambda q,f: scrape_generic(q,f,"https://www.sellpy.se/sok/","/product/","Sellpy"), "https://www.sellpy.se/"),
+    ("Tradera", scrape_tradera, "https://www.tradera.com/"),
+    ("Blocket", lambda q,f: scrape_generic(q,f,"https://www.blocket.se/annonser/hela_sverige","/annons/","Blocket"), "https://www.blocket.se/"),
+    ("Plick", lambda q,f: scrape_generic(q,f,"https://www.plick.com/search/","/p/","Plick"), "https://www.plick.com/"),
+    ("Facebook", lambda q,f: scrape_generic(q,f,"https://m.facebook.com/marketplace/search/","/marketplace/item/","Facebook Marketplace"), "https://m.facebook.com/"),
 ]
 
 # ---------------- PRODUCT PAGE ENRICH ----------------
+def page_cache_key(url, title):
+    return f"page|{url}|{title}"
+
 def enrich_product(prod):
     """Fetch product url page, extract full text and page price and parse jeans sizes etc."""
     url = prod.get("url")
@@ -301,37 +641,66 @@ def enrich_product(prod):
     prod["_page_price"] = None
     prod["_jeans"] = None
     prod["_inferred_size"] = None
-    try:
-        if not url:
+    if not url:
+        return prod
+    # the same listing shows up again for repeat queries with other filters: reuse the parsed page
+    key = page_cache_key(url, title)
+    fields = cache_get(key)
+    if fields is None:
+        try:
+            # concurrent searches that surface the same listing share one fetch + parse
+            fields = single_flight(key, lambda: analyze_page(url, title))
+        except Exception as e:
+            print(f"[enrich_product] error for {url} -> {e}")
             return prod
-        html = http_get(url)
-        if not html:
+        if fields is None:
             return prod
-        soup = BeautifulSoup(html, "html.parser")
-        text = title + " " + soup.get_text(separator=' ')
-        text = clean_text(text)
-        prod["_full_text"] = text
-        price = parse_price_from_page(text)
-        prod["_page_price"] = price
-        jeans = parse_jeans(text)
-        if jeans:
-            prod["_jeans"] = jeans
-            if jeans.get("waist"):
-                prod["_inferred_size"] = waist_to_size(jeans["waist"])
-        else:
-            # try to detect token M/L/XS etc
-            tokens = re.findall(r'\b(xs|s|m|l|xl|xxl)\b', text, flags=re.IGNORECASE)
-            if tokens:
-                prod["_inferred_size"] = tokens[0].upper()
-            else:
-                # detect numeric child size
-                m = re.search(r'\b(9[0-9]|1[0-6][0-9])\b', text)
-                if m:
-                    prod["_inferred_child_size"] = int(m.group(1))
-    except Exception as e:
-        print(f"[enrich_product] error for {prod.get('url')} -> {e}")
+        cache_set(key, fields)
+    prod.update(fields)
     return prod
 
+def analyze_page(url, title):
+    """Fetch and parse one product page into the enrich_product fields (None if it couldn't be read)."""
+    html = http_get(url, revalidate=True)
+    if html is NOT_MODIFIED:
+        page_text = remembered_page(url)
+        if page_text is None:  # evicted since the request went out
+            return None
+    else:
+        if not html:
+            return None
+        # lxml tree + itertext is far lighter than a BeautifulSoup DOM for "all visible text"
+        tree = parse_html(html)
+        if tree is None:
+            return None
+        etree.strip_elements(tree, "script", "style", "template", with_tail=False)
+        page_text = clean_text(" ".join(tree.itertext()))
+        remember_page(url, page_text)
+    text = clean_text(title + " " + page_text)
+    # scoring matches on lowercased text: cache only that form (the original is just for DEBUG_MODE output);
+    # price/size/jeans parsing below is case-insensitive
+    fields = {"_full_text_lc": text.lower()}
+    if DEBUG_MODE:
+        fields["_full_text"] = text
+    text = fields["_full_text_lc"]
+    fields["_page_price"] = parse_price_from_page(text)
+    jeans = parse_jeans(text)
+    if jeans:
+        fields["_jeans"] = jeans
+        if jeans.get("waist"):
+            fields["_inferred_size"] = waist_to_size(jeans["waist"])
+    else:
+        # try to detect token M/L/XS etc (bare in the title, labelled in the page; see SIZE_LABEL)
+        m = SIZE_TOKEN_RE.search(title) or LABELLED_SIZE_RE.search(text)
+        if m:
+            fields["_inferred_size"] = m.group(1).upper()
+        else:
+            # detect numeric child size
+            m = CHILD_SIZE_RE.search(text)
+            if m:
+                fields["_inferred_child_size"] = int(m.group(1))
+    return fields
+
 # ---------------- SCORING ----------------
 WEIGHTS = {
     "item": 30,
@@ -360,26 +729,86 @@ def price_points(page_price, price_max):
     score = WEIGHTS["price"] * max(0.0, 1.0 - ratio)
     return round(score, 2)
 
-def score_one(prod, filters, strict_kids=True):
+MALE_RE = words_re(SYNONYMS.get("herr", []))
+FEMALE_RE = words_re(SYNONYMS.get("dam", []))
+
+def size_pattern(size):
+    """Regex for a size filter in lowercased page text. Numeric sizes (e.g. 32) match as a bare token;
+    letter sizes need a SIZE_LABEL in front, the same rule analyze_page uses to infer sizes."""
+    token = re.escape(size.lower())
+    if size.isdigit():
+        return re.compile(r'\b' + token + r'\b')
+    return re.compile(r'\b' + SIZE_LABEL + token + r'\b')
+
+def prepare_filters(filters):
+    """Normalize request filters once per search, so scoring doesn't re-derive them for every product."""
+    def text(key):
+        return str(filters.get(key) or "").strip()
+    try:
+        price_max = float(filters["price_max"]) if filters.get("price_max") is not None else None
+    except (TypeError, ValueError):
+        price_max = None
+    def alts(term):
+        return term_alternatives(term.lower()) if term else ()
+    item = text("item")
+    brand, style, gender, color = text("brand"), text("style"), text("gender").lower(), text("color")
+    size = text("size")
+    return {
+        "item": item,
+        "brand": brand,
+        "style": style,
+        "gender": gender,
+        "color": color,
+        # synonym expansions, so scoring each product is just substring checks
+        "item_terms": alts(item),
+        "item_token_terms": [alts(tok) for tok in WORD_RE.findall(item.lower())],
+        "brand_terms": alts(brand),
+        "style_terms": alts(style),
+        "gender_terms": alts(gender),
+        "color_terms": alts(color),
+        "size": size,
+        "size_re": size_pattern(size) if size else None,
+        "size_title_re": re.compile(r'\b' + re.escape(size.lower()) + r'\b') if size else None,
+        "kids": parse_bool(filters.get("kids")),
+        "price_max": price_max,
+    }
+
+def max_score(ctx):
+    """Best rating score_one can give for these prepared filters (mirrors its point allocation)."""
+    total = 2  # url + title metadata bonus
+    for key in ("item", "brand", "style", "gender", "color", "size"):
+        if ctx[key]:
+            total += WEIGHTS[key]
+    if ctx["kids"] is False:
+        total += WEIGHTS["kids"] * 0.5
+    if ctx["price_max"] is not None:
+        total += WEIGHTS["price"]
+    return min(100.0, total)
+
+def score_one(prod, filters, strict_kids=True, ctx=None):
     """
     Returns (score_float, breakdown dict).
     strict_kids: if True enforce veto for kids mismatch; if False allow partial matches (for debugging)
+    ctx: prepare_filters(filters), when the caller scores many products against the same filters
     """
+    if ctx is None:
+        ctx = prepare_filters(filters)
     breakdown = {}
-    full = (prod.get("_full_text") or prod.get("title","")).lower()
+    # normalize once; every term check below reuses it
+    full = prod.get("_full_text_lc") or clean_text(prod.get("_full_text") or prod.get("title","")).lower()
     score = 0.0
 
     # item (veto if not found)
-    item = (filters.get("item") or "").strip()
+    item = ctx["item"]
     if item:
-        item_found = term_in_text(full, item)
+        item_found = contains_any(full, ctx["item_terms"])
         breakdown["item_found"] = bool(item_found)
         if not item_found:
             # try fuzzy token presence: check tokens intersection between item and full text
             # split item into tokens and check if any synonym appears
             found_any = False
-            for token in re.findall(r'\w+', item.lower()):
-                if term_in_text(full, token):
+            for token_terms in ctx["item_token_terms"]:
+                if contains_any(full, token_terms):
                     found_any = True
                     break
             if not found_any:
@@ -390,29 +819,29 @@ def score_one(prod, filters, strict_kids=True):
         breakdown["item_found"] = False
 
     # brand
-    brand = (filters.get("brand") or "").strip()
+    brand = ctx["brand"]
     if brand:
-        if term_in_text(full, brand):
+        if contains_any(full, ctx["brand_terms"]):
             score += WEIGHTS["brand"]
             breakdown["brand"] = True
         else:
             breakdown["brand"] = False
 
     # style
-    style = (filters.get("style") or "").strip()
+    style = ctx["style"]
     if style:
-        if term_in_text(full, style):
+        if contains_any(full, ctx["style_terms"]):
             score += WEIGHTS["style"]
             breakdown["style"] = True
         else:
             breakdown["style"] = False
 
     # gender
-    gender = (filters.get("gender") or "").strip().lower()
+    gender = ctx["gender"]
     inferred_gender = None
-    if any(k in full for k in SYNONYMS.get("herr", [])):
+    if MALE_RE.search(full):
         inferred_gender = "herr"
-    elif any(k in full for k in SYNONYMS.get("dam", [])):
+    elif FEMALE_RE.search(full):
         inferred_gender = "dam"
     else:
         inferred_gender = None
@@ -423,7 +852,7 @@ def score_one(prod, filters, strict_kids=True):
             breakdown["veto"] = "gender_mismatch"
             return (0.0, breakdown)
         # if explicit match in text -> full points, otherwise partial if inferred adult
-        if term_in_text(full, gender):
+        if contains_any(full, ctx["gender_terms"]):
             score += WEIGHTS["gender"]
             breakdown["gender"] = "explicit"
         else:
@@ -439,8 +868,8 @@ def score_one(prod, filters, strict_kids=True):
                 breakdown["gender"] = "inferred_partial"
 
     # kids detection + veto
-    kids_filter = parse_bool(filters.get("kids"))
-    is_kid = detect_kids_by_size_or_text(full)
+    kids_filter = ctx["kids"]
+    is_kid = kids_in_normalized(full)
     breakdown["is_kid_detected"] = bool(is_kid)
     if kids_filter is True:
         if not is_kid:
@@ -462,16 +891,16 @@ def score_one(prod, filters, strict_kids=True):
             score += WEIGHTS["kids"] * 0.5
 
     # color
-    color = (filters.get("color") or "").strip()
+    color = ctx["color"]
     if color:
-        if term_in_text(full, color):
+        if contains_any(full, ctx["color_terms"]):
             score += WEIGHTS["color"]
             breakdown["color"] = True
         else:
             breakdown["color"] = False
 
     # size matching (including jeans conversion)
-    size_filter = (filters.get("size") or "").strip()
+    size_filter = ctx["size"]
     matched_size = False
     if size_filter:
         size_filter_norm = size_filter.lower()
@@ -483,8 +912,8 @@ def score_one(prod, filters, strict_kids=True):
             ws = prod["_jeans"]["waist"]
             if waist_to_size(ws).lower() == size_filter_norm:
                 matched_size = True
-        # direct token present (user may pass numeric 32 etc)
-        if not matched_size and re.search(r'\b' + re.escape(size_filter) + r'\b', full):
+        # direct token present: labelled in the page text (numeric may be bare), or as a word in the title
+        if not matched_size and (ctx["size_re"].search(full) or ctx["size_title_re"].search((prod.get("title") or "").lower())):
             matched_size = True
         if matched_size:
             score += WEIGHTS["size"]
@@ -492,7 +921,7 @@ def score_one(prod, filters, strict_kids=True):
 
     # page price points
     page_price = prod.get("_page_price")
-    pp = price_points(page_price, filters.get("price_max"))
+    pp = price_points(page_price, ctx["price_max"])
     breakdown["price_points"] = pp
     score += pp
 
@@ -505,55 +934,136 @@ def score_one(prod, filters, strict_kids=True):
     return (final, breakdown)
 
 # ---------------- ORCHESTRATOR ----------------
-def run_scrapers(query, filters):
-    """Run all site scrapers concurrently and return combined candidate list."""
-    candidates = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_SCRAPER_WORKERS, len(SCRAPERS))) as ex:
-        futures = {ex.submit(fn, query, filters): name for (name, fn) in SCRAPERS}
-        for fut in concurrent.futures.as_completed(futures, timeout=30):
-            site = futures[fut]
-            try:
-                res = fut.result()
-            except Exception as e:
-                print(f"[run_scrapers] {site} scraper failed: {e}")
-                res = []
-            if res:
+# Shared pools so each request doesn't pay thread startup/teardown for its fan-out.
+_scraper_pool = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_SCRAPER_WORKERS, thread_name_prefix="scrape")
+_product_pool = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_PRODUCT_FETCH_WORKERS, thread_name_prefix="product")
+# Hosts every search hits; with PREHEAT_CONNECTIONS a serving worker opens one connection to each so its
+# first search skips the TLS handshakes.
+WARM_URLS = tuple(home for (_, _, home) in SCRAPERS)
+
+def warm_connection(url):
+    """HEAD url through SESSION so a keep-alive connection to its host sits in the pool; errors are ignored."""
+    try:
+        SESSION.head(url, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT), allow_redirects=False).close()
+    except Exception:
+        pass
+
+def warm_connections():
+    """Queue a warm_connection per scraped host (under the per-host limits).
+    Called from gunicorn's post_worker_init hook (gunicorn.conf.py), never at import."""
+    if not PREHEAT_CONNECTIONS:
+        return
+    for url in WARM_URLS:
+        submit_to_host(_scraper_pool, url, warm_connection, url)
+
+def shutdown_pools():
+    """Drop queued scrapes/page fetches instead of running them for clients that are gone.
+    Called from gunicorn's worker_exit hook (gunicorn.conf.py): by the time atexit handlers run,
+    concurrent.futures has already joined the pools and drained their queues."""
+    for pool in (_scraper_pool, _product_pool):
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def scrape_cache_key(name, query):
+    return f"scrape|{name}|{query}"
+
+def cached_scrape(name, fn, query, filters):
+    """Run one site scraper, serving repeat queries from the TTL cache (scrapers only depend on query)."""
+    key = scrape_cache_key(name, query)
+    cached = cache_get(key)
+    if cached is None:
+        fresh = single_flight(key, lambda: fn(query, filters))
+        if fresh:
+            cache_set(key, fresh, keep_stale=True)
+            cached = fresh
+        else:
+            # empty usually means the site failed or blocked us: serve the last good listing if we have one,
+            # and don't cache the empty result so the next search retries
+            cached = cache_get(key, ttl=STALE_IF_ERROR_TTL)
+            if not cached:
+                return fresh
+    # hand out copies: enrich/scoring annotate candidates in place
+    return [dict(c) for c in cached]
+
+def submit_uncached(pool, url, cache_key, fn, *args):
+    """submit_to_host(pool, url, fn, *args), except that work which won't make a request (no url, or its
+    result is already cached under cache_key) runs right here instead of waiting for a host slot."""
+    if url and cache_get(cache_key) is None:
+        return submit_to_host(pool, url, fn, *args)
+    fut = concurrent.futures.Future()
+    try:
+        fut.set_result(fn(*args))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+def iter_enriched_candidates(query, filters, outcome=None):
+    """Scrape all sites and yield candidates enriched with their product page, in arrival order.
+    A site's product pages are fetched as soon as that site's listing is scraped, so fast sites aren't
+    held back by slow ones. Closing the generator early cancels any work that hasn't started.
+    If SEARCH_TIMEOUT cuts the search short, outcome["timed_out"] is set (when an outcome dict is given)."""
+    limit = TOP_PER_SITE * len(SCRAPERS)  # cap total product fetches to avoid huge loads
+    seen = set()  # urls already queued: reposts across sites (e.g. Plick/Facebook of a Vinted ad) are fetched once
+    scrapes = {submit_uncached(_scraper_pool, home, scrape_cache_key(name, query), cached_scrape, name, fn, query, filters): name
+               for (name, fn, home) in SCRAPERS}
+    pending = set(scrapes)
+    deadline = time.monotonic() + SEARCH_TIMEOUT
+    try:
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                print(f"[iter_enriched_candidates] timed out, {len(pending)} sites/pages still pending")
+                if outcome is not None:
+                    outcome["timed_out"] = True
+                return
+            for fut in done:
+                site = scrapes.get(fut)
+                if site is None:
+                    try:
+                        yield fut.result()
+                    except Exception as e:
+                        print(f"[iter_enriched_candidates] product fetch failed: {e}")
+                    continue
+                try:
+                    res = fut.result() or []
+                except Exception as e:
+                    print(f"[iter_enriched_candidates] {site} scraper failed: {e}")
+                    continue
                 # each res element should be dict with title,url
-                candidates.extend(res)
-    return candidates
-
-def enrich_candidates(candidates, max_workers=MAX_PRODUCT_FETCH_WORKERS):
-    """Fetch product pages concurrently to enrich candidates with _full_text and _page_price."""
-    enriched = []
-    # limit total product fetches to avoid huge loads
-    limit = min(len(candidates), TOP_PER_SITE * len(SCRAPERS))
-    candidates = candidates[:limit]
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = [ex.submit(enrich_product, c) for c in candidates]
-        for fut in concurrent.futures.as_completed(futures, timeout=60):
-            try:
-                enriched.append(fut.result())
-            except Exception as e:
-                print(f"[enrich_candidates] product fetch failed: {e}")
-    return enriched
+                for c in res:
+                    if len(seen) >= limit:
+                        break
+                    url = c.get("url")
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                    key = page_cache_key(url, c.get("title","")) if url else None
+                    pending.add(submit_uncached(_product_pool, url, key, enrich_product, c))
+    finally:
+        for fut in pending:
+            fut.cancel()
 
 def find_best(query, filters, top_n=TOP_RETURN, strict_kids=True):
     """Full pipeline: scrapers -> enrich -> score -> sort -> return top_n"""
-    cache_key = f"find|{query}|{str(filters)}"
+    # order-independent and safe for unhashable filter values; unset filters (None or "") score the same, so leave them out
+    cache_key = ("find", query, tuple(sorted((k, str(v)) for k, v in filters.items() if v is not None and v != "")))
     cached = cache_get(cache_key)
-    if cached:
+    if cached is not None:
         return cached
+    # identical searches arriving together share one pipeline run
+    return single_flight(cache_key, lambda: _find_best_uncached(cache_key, query, filters, top_n, strict_kids))
 
-    candidates = run_scrapers(query, filters)
-    if not candidates:
-        cache_set(cache_key, [])
-        return []
-
-    enriched = enrich_candidates(candidates)
+def _find_best_uncached(cache_key, query, filters, top_n, strict_kids):
+    ctx = prepare_filters(filters)
+    target = max_score(ctx)
+    at_target = 0
+    stopped_early = False
+    outcome = {}
     scored = []
-    for p in enriched:
+    products = iter_enriched_candidates(query, filters, outcome)
+    for p in products:
         try:
-            sc, breakdown = score_one(p, filters, strict_kids=strict_kids)
+            sc, breakdown = score_one(p, filters, strict_kids=strict_kids, ctx=ctx)
         except Exception as e:
             print(f"[find_best] scoring failed for {p.get('url')} -> {e}")
             sc, breakdown = 0.0, {"final": 0}
@@ -565,23 +1075,37 @@ def find_best(query, filters, top_n=TOP_RETURN, strict_kids=True):
         except:
             p["_price_norm"] = None
         scored.append(p)
+        # later arrivals can at best tie these on score. Stopping here means that among max-score matches
+        # the first top_n to arrive win, not the cheapest (price only orders them below); so a list cut
+        # this way is cached briefly, and a later identical search can find cheaper ties
+        if sc >= target:
+            at_target += 1
+            if at_target >= top_n:
+                stopped_early = True
+                break
+    products.close()
+    # results from a search cut short (early stop, or sites still pending at the deadline) are incomplete:
+    # serve them to identical searches only briefly
+    ttl = PARTIAL_RESULT_TTL if stopped_early or outcome.get("timed_out") else CACHE_TTL
+    if not scored:
+        # the user will likely retry with other filters soon; don't pin a miss for the full TTL
+        cache_set(cache_key, [], ttl=EMPTY_RESULT_TTL)
+        return []
 
     # ensure we return useful alternatives: if everything vetoed to 0, still return top by fuzzy item match
     filtered = [p for p in scored if p["_rating"] > 0]
     if not filtered:
         # fallback: select top 10 by fuzzy item token presence (not 0-rated veto)
-        scored.sort(key=lambda x: x["_rating"], reverse=True)
-        top = scored[:top_n]
-        cache_set(cache_key, top)
+        top = heapq.nlargest(top_n, scored, key=lambda x: x["_rating"])
+        cache_set(cache_key, top, ttl=ttl)
         return top
 
-    # sort by rating desc then price asc (None price -> INF)
+    # rating desc then price asc (None price -> INF); only the top_n are ever returned, so no full sort
     def sortkey(x):
         price = x.get("_price_norm")
         return (-x.get("_rating",0), float('inf') if price is None else price)
-    filtered.sort(key=sortkey)
-    top = filtered[:top_n]
-    cache_set(cache_key, top)
+    top = heapq.nsmallest(top_n, filtered, key=sortkey)
+    cache_set(cache_key, top, ttl=ttl)
     return top
 
 # ---------------- ROUTES ----------------
@@ -613,12 +1137,13 @@ def find_item_route():
     except:
         price_max = None
 
-    # build query (used by scrapers)
+    # build query (used by scrapers); normalized once here so it is also the canonical cache key
     if data.get("query"):
-        query = data.get("query")
+        query = str(data.get("query"))
     else:
-        parts = [p for p in [brand, item, color, style] if p]
+        parts = [str(p) for p in [brand, item, color, style] if p]
         query = " ".join(parts)
+    query = clean_text(query).lower()
 
     filters = {
         "brand": brand,
@@ -669,4 +1194,5 @@ def find_item_route():
     })
 
 if __name__ == "__main__":
+    # local development only; production runs under gunicorn (see Procfile)
     app.run(host="0.0.0.0", port=10000)